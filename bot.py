@@ -19,13 +19,147 @@
 # |   or equal to the float                                           #
 # |                                                                   #
 # +- Queue.Queue                                                      #
-#  `- A thread safe queue data structure, could probably also make    #
-#     use of `collections.deque` instead.                             # 
+# |`- A thread safe queue data structure, could probably also make    #
+# |   use of `collections.deque` instead.                             # 
+# |                                                                   #
+# +- multiprocessing                                                  #
+# |`- Worker pool used to score candidate placements in parallel      #
+# |                                                                   #
+# +- multiprocessing.sharedctypes.RawArray                            #
+# |`- Lock free shared memory arrays holding the board state, so      #
+# |   workers can read it without pickling                            #
+# |                                                                   #
+# +- time.time                                                        #
+# |`- Wall clock time, used to respect the move deadline             #
+# |                                                                   #
+# +- itertools.islice                                                 #
+#  `- Reads candidate placements lazily, a slice at a time            #
 #---------------------------------------------------------------------#
 from math import ceil
 from Queue import Queue
 from sys import stdin, stdout, stderr, argv
+from time import time
+from itertools import islice
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+
+#---------------------------------------#
+# Shared board state                    #
+#---------------------------------------#
+
+# Owner codes used in the shared owner array
+OWNER_NEUTRAL = 0
+OWNER_SELF = 1
+OWNER_OPPONENT = 2
+
+# Minimum number of candidates before it pays off to use the worker pool
+MIN_PARALLEL_CANDIDATES = 100
+
+# Maximum number of candidates scored per move
+MAX_PLACEMENT_CANDIDATES = 20000
+
+# Number of candidates handed to a worker at once
+PLACEMENT_SLICE_SIZE = 200
+
+# Share of the move time spent on scoring placements, the rest is kept as
+# a safety margin for the other work and for writing the move
+MOVE_TIME_SHARE = 0.5
+
+# Board arrays as seen by a worker process, set by `init_board_worker`
+shared_board = {}
+
+def init_board_worker(troops, owners, offsets, neighbours):
+    """
+    Pool initializer that stores the shared board arrays in the worker
+    """
+    shared_board['troops'] = troops
+    shared_board['owners'] = owners
+    shared_board['offsets'] = offsets
+    shared_board['neighbours'] = neighbours
+def score_placement(board, placement):
+    """
+    Returns the score of a single placement, a list of (index, troops)
+    pairs. Only the placed regions are looked at: every troop that helps
+    to cover the defence needed against neighbouring opponent troops is
+    worth a point, every neutral or enemy neighbour that becomes
+    beatable is worth two.
+
+    Tests:
+    >>> board = {'troops': [2, 4, 3], 'owners': [1, 2, 0], 'offsets': [0, 2, 3, 4], 'neighbours': [1, 2, 0, 0]}
+    >>> score_placement(board, [(0, 1)])
+    1
+    >>> score_placement(board, [(0, 4)])
+    3
+    >>> score_placement(board, [(0, 6)])
+    5
+    """
+    # Get board arrays
+    troops = board['troops']
+    owners = board['owners']
+    offsets = board['offsets']
+    neighbours = board['neighbours']
+
+    # Running score
+    score = 0
+
+    # Loop through placed troops
+    for index, extra_troops in placement:
+
+        # Get troop counts before and after placing
+        before = troops[index]
+        after = before + extra_troops
+
+        # Get neighbours of region
+        region_neighbours = neighbours[offsets[index]:offsets[index + 1]]
+
+        # Get total enemy troop count
+        enemy_troop_count = sum([troops[n] for n in region_neighbours if owners[n] == OWNER_OPPONENT])
+
+        # Reward troops that are needed to hold the region
+        if enemy_troop_count > 0:
+            needed = int(ceil(enemy_troop_count * 0.6))
+            score += min(after, needed) - min(before, needed)
+
+        # Reward neighbours that can now be taken
+        for n in region_neighbours:
+            if owners[n] != OWNER_SELF:
+                needed = int(ceil(troops[n] / 0.6))
+                if before - 1 < needed <= after - 1:
+                    score += 2
+
+    # Return score
+    return score
+def score_placement_slice(candidates):
+    """
+    Scores a slice of (candidate index, placement) pairs using the shared
+    board and returns the best (score, candidate index) pair
+    """
+    # Best pair found so far
+    best = None
+
+    # Loop through candidates
+    for candidate_index, placement in candidates:
+
+        # Score candidate
+        score = score_placement(shared_board, placement)
+
+        # Keep the highest score, earliest candidate wins ties
+        if best is None or score > best[0]:
+            best = (score, candidate_index)
+
+    # Return best pair
+    return best
     
+#---------------------------------------#
+# Starting pick weights                 #
+#---------------------------------------#
+
+# Weights of the starting pick score terms, every term lies between 0 and 1
+PICK_DENSITY_WEIGHT = 1.0
+PICK_VALUE_WEIGHT = 1.0
+PICK_DEFENSIBILITY_WEIGHT = 0.5
+PICK_CENTRALITY_WEIGHT = 0.25
+
 #---------------------------------------#
 # Main bot class                        #
 #---------------------------------------#
@@ -59,91 +193,140 @@ class Bot(object):
 
         # Dictionary containing connections between regions
         self.connections = {}
+
+        # Dictionary containing size, entry points and value per continent
+        self.continent_metrics = {}
+
+        # Set containing bridges of the whole map as (region id, region id) pairs
+        self.map_bridges = set()
+
+        # Set containing bridges between our own regions
+        self.empire_bridges = set()
+
+        # Set containing the regions the empire chokepoints were computed for
+        self.empire_region_ids = frozenset()
+
+        # Dictionary containing the board in shared memory arrays
+        self.board = {}
+
+        # Dictionary containing the board array index of every region
+        self.board_index = {}
+
+        # Worker pool reading the shared board
+        self.board_pool = None
+
+        # Number of workers in the pool
+        self.board_workers = 0
+
+        # Estimated opponent state
+        self.opponent = OpponentTracker(self)
     def run(self):
         """
         Main bot loop that reads input
         """
-        # Keep running until no input is given
-        while not stdin.closed:
+        # Make sure workers are stopped however the loop ends
+        try:
 
-            # Try to read from stdin and do stuff with it
-            try:
+            # Keep running until no input is given
+            while not stdin.closed:
+
+                # Try to read from stdin and do stuff with it
+                try:
                 
-                # Read line from stdin
-                rawline = stdin.readline()
+                    # Read line from stdin
+                    rawline = stdin.readline()
 
-                # End of file?
-                if len(rawline) == 0:
-                    break
+                    # End of file?
+                    if len(rawline) == 0:
+                        break
 
-                # Remove whitespace from ends of line
-                line = rawline.strip()
+                    # Remove whitespace from ends of line
+                    line = rawline.strip()
 
-                # Nothing in line
-                if len(line) == 0:
-                    continue
+                    # Nothing in line
+                    if len(line) == 0:
+                        continue
 
-                # Split into parts
-                parts = line.split()
+                    # Split into parts
+                    parts = line.split()
 
-                # Get command                
-                cmd = parts[0]
+                    # Get command                
+                    cmd = parts[0]
 
-                # Update settings
-                if cmd == 'settings':
-                    self.update_settings(parts[1], parts[2])
+                    # Update settings
+                    if cmd == 'settings':
+                        self.update_settings(parts[1], parts[2])
 
-                # Set up map
-                elif cmd == 'setup_map':
-                    self.setup_map(parts[1:])
+                    # Set up map
+                    elif cmd == 'setup_map':
+                        self.setup_map(parts[1:])
 
-                # Update map
-                elif cmd == 'update_map':
-                    self.update_map(parts[1:])
+                        # Map is complete, start workers before any move deadline
+                        if parts[1] == 'neighbors':
+                            self.share_board()
+                            self.start_board_workers()
 
-                # Pick starting regions
-                elif cmd == 'pick_starting_regions':
+                    # Update map
+                    elif cmd == 'update_map':
+                        self.update_map(parts[1:])
 
-                    # Ignore time parameter
-                    self.pick_starting_regions(parts[2:])
-                    
-                # Make a move
-                elif cmd == 'go':
+                    # Track opponent moves
+                    elif cmd == 'opponent_moves':
+                        self.opponent.apply_moves(parts[1:])
 
-                    # Place armies
-                    if parts[1] == 'place_armies':
+                    # Pick starting regions
+                    elif cmd == 'pick_starting_regions':
 
-                        # Start placing troops
-                        stdout.write(self.place_troops() + '\n')
+                        # Ignore time parameter, picks are scored in linear time
+                        stdout.write(self.pick_starting_regions(parts[2:]) + '\n')
 
-                        # Print troop placements
+                        # Print picked regions
                         stdout.flush()
+                    
+                    # Make a move
+                    elif cmd == 'go':
 
-                    # attack and transfer
-                    elif parts[1] == 'attack/transfer':
+                        # Start the clock right away
+                        deadline = self.get_move_deadline(parts[2] if len(parts) > 2 else None)
 
-                        # Start transfer of troops and attack of regions
-                        stdout.write(self.attack_transfer() + '\n')
+                        # Place armies
+                        if parts[1] == 'place_armies':
 
-                        # Print attacks/transfers
-                        stdout.flush()
+                            # Start placing troops within the given time
+                            stdout.write(self.place_troops(deadline) + '\n')
 
-                # Unknown command
-                else:
-                    stderr.write('Unable to understand line: "%s"\n' % (line))
+                            # Print troop placements
+                            stdout.flush()
 
-            # Stop when end of file is reached
-            except EOFError:
-                return
+                        # attack and transfer
+                        elif parts[1] == 'attack/transfer':
 
-            # Stop when keyboard interrupt is hit (can only be done by the Godly one)
-            except KeyboardInterrupt:
-                print 'Ctrl-C pressed; now shutting down.'
-                return
+                            # Start transfer of troops and attack of regions
+                            stdout.write(self.attack_transfer() + '\n')
+
+                            # Print attacks/transfers
+                            stdout.flush()
+
+                    # Unknown command
+                    else:
+                        stderr.write('Unable to understand line: "%s"\n' % (line))
 
-            # Stop running, damn it!!one111!
-            except:
-                raise
+                # Stop when end of file is reached
+                except EOFError:
+                    return
+
+                # Stop when keyboard interrupt is hit (can only be done by the Godly one)
+                except KeyboardInterrupt:
+                    print 'Ctrl-C pressed; now shutting down.'
+                    return
+
+                # Stop running, damn it!!one111!
+                except:
+                    raise
+
+        # Stop workers, so the interpreter does not wait for them at exit
+        finally:
+            self.stop_board_workers()
     def setup_map(self, options):
         """
         Set up game map for use
@@ -205,7 +388,10 @@ class Bot(object):
                     'troop_count': 0,
                     'continent_id': continent_id,
                     'is_empire_border': False,
-                    'is_continent_border': False
+                    'is_continent_border': False,
+                    'is_map_chokepoint': False,
+                    'is_empire_chokepoint': False,
+                    'centrality': 0.0
                 }
 
             # Set up edges between countries
@@ -257,6 +443,11 @@ class Bot(object):
                         if self.regions[neighbour_id]['continent_id'] != continent_id:
                             self.regions[region_id]['is_continent_border'] = True
                             self.regions[neighbour_id]['is_continent_border'] = True
+
+        # Map is complete once neighbours are known, so look for chokepoints
+        if map_type == 'neighbors':
+            self.update_map_chokepoints()
+            self.update_map_metrics()
                             
     def update_map(self, options):
         """
@@ -300,6 +491,12 @@ class Bot(object):
             # Update region
             self.regions[region_id]['owner'] = region_owner
             self.regions[region_id]['troop_count'] = region_troop_count
+
+        # Merge with opponent estimate for regions we can not see
+        self.opponent.update_map([int(options[i]) for i in range(0, len(options), 3)])
+
+        # Ownership might have changed, so update empire chokepoints
+        self.update_empire_chokepoints()
             
     def update_settings(self, key, value):
         """
@@ -316,11 +513,90 @@ class Bot(object):
         """
         # Set key to value
         self.settings[key] = value
+    def update_map_metrics(self):
+        """
+        Precompute map metrics used to score starting picks:
+         - Per continent: region count, number of entry points (regions
+           bordering another continent), defensibility (one over the
+           number of entry points) and value (bonus per region, relative
+           to the best continent)
+         - Per region: closeness centrality, the inverse of the average
+           distance to every reachable region
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5"])
+        >>> sorted(bot.continent_metrics[1].items())
+        [('defensibility', 0.5), ('entry_count', 2), ('region_count', 2), ('value', 0.6)]
+        >>> sorted(bot.continent_metrics[2].items())
+        [('defensibility', 0.5), ('entry_count', 2), ('region_count', 3), ('value', 1.0)]
+        >>> [round(bot.regions[region_id]['centrality'], 2) for region_id in sorted(bot.regions)]
+        [0.8, 0.57, 0.57, 0.67, 0.44]
+        >>> bot.setup_map(["regions", "6", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2"])
+        >>> bot.regions[6]['centrality']
+        0.0
+        """
+        # Set up continent metrics
+        self.continent_metrics = {}
+        for continent_id in self.continents:
+            self.continent_metrics[continent_id] = {
+                'region_count': 0,
+                'entry_count': 0
+            }
+
+        # Count regions and entry points
+        for region in self.regions.itervalues():
+            metrics = self.continent_metrics[region['continent_id']]
+            metrics['region_count'] += 1
+            if region['is_continent_border']:
+                metrics['entry_count'] += 1
+
+        # Derive defensibility and bonus per region
+        for continent_id, metrics in self.continent_metrics.iteritems():
+            metrics['defensibility'] = 1.0 / max(1, metrics['entry_count'])
+            metrics['value'] = float(self.continents[continent_id]) / max(1, metrics['region_count'])
+
+        # Scale value relative to the best continent
+        best_value = max([metrics['value'] for metrics in self.continent_metrics.itervalues()] + [0])
+        for metrics in self.continent_metrics.itervalues():
+            if best_value > 0:
+                metrics['value'] /= best_value
+
+        # Loop through regions to get centrality
+        for region_id in self.regions:
+
+            # Breadth first search, one level at a time
+            visited = set([region_id])
+            frontier = [region_id]
+            distance = 0
+            total_distance = 0
+            while frontier:
+                distance += 1
+                next_frontier = []
+                for node in frontier:
+                    for neighbour_id in self.get_neighbours(node):
+                        if neighbour_id not in visited:
+                            visited.add(neighbour_id)
+                            next_frontier.append(neighbour_id)
+                total_distance += distance * len(next_frontier)
+                frontier = next_frontier
+
+            # Isolated regions are not central at all
+            if total_distance > 0:
+                self.regions[region_id]['centrality'] = float(len(visited) - 1) / total_distance
+            else:
+                self.regions[region_id]['centrality'] = 0.0
     def pick_starting_regions(self, options):
         """
-        Pick starting regions based on two sorting attributes:
-         - Reward
+        Pick starting regions using the precomputed map metrics, sorted by
+        a weighted sum of:
          - Pickable regions in continent / total regions in continent
+         - Continent value
+         - Continent defensibility
+         - Region centrality
 
         Tests:
         >>> bot = Bot()
@@ -328,71 +604,41 @@ class Bot(object):
         >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2", "6", "3"])
         >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5,6"])
         >>> bot.pick_starting_regions(["1", "2", "3", "4", "5", "6"])
-        '6 3 4 5 1 2'
+        '6 4 3 5 1 2'
         >>> bot2 = Bot()
         >>> bot2.setup_map(["super_regions", "1", "5", "2", "2", "3", "5", "4", "3", "5", "7", "6", "2"])
         >>> bot2.setup_map(["regions", '1', '1', '2', '1', '3', '1', '4', '1', '5', '1', '6', '1', '7', '1', '8', '1', '9', '1', '10', '2', '11', '2', '12', '2', '13', '2', '14', '3', '15', '3', '16', '3', '17', '3', '18', '3', '19', '3', '20', '3', '21', '4', '22', '4', '23', '4', '24', '4', '25', '4', '26', '4', '27', '5', '28', '5', '29', '5', '30', '5', '31', '5', '32', '5', '33', '5', '34', '5', '35', '5', '36', '5', '37', '5', '38', '5', '39', '6', '40', '6', '41', '6', '42', '6'])
         >>> bot2.setup_map(["neighbors", '1', '2,4,30', '2', '4,3,5', '3', '5,6,14', '4', '5,7', '5', '6,7,8', '6', '8', '7', '8,9', '8', '9', '9', '10', '10', '11,12', '11', '12,13', '12', '13,21', '14', '15,16', '15', '16,18,19', '16', '17', '17', '19,20,27,32,36', '18', '19,20,21', '19', '20', '20', '21,22,36', '21', '22,23,24', '22', '23,36', '23', '24,25,26,36', '24', '25', '25', '26', '27', '28,32,33', '28', '29,31,33,34', '29', '30,31', '30', '31,34,35', '31', '34', '32', '33,36,37', '33', '34,37,38', '34', '35', '36', '37', '37', '38', '38', '39', '39', '40,41', '40', '41,42', '41', '42'])
         >>> bot2.pick_starting_regions(["5", "3", "11", "12", "16", "18", "26", "25", "31", "38", "42", "41"])
-        '11 12 42 41 26 25'
+        '41 42 12 11 16 18'
         """
-        # Set up dictionary to count starting regions per continent
-        region_count = {}
-
-        # Set up dictionary to hold total region count per continent
-        total_region_count = {}
-
-        # Loop through continents to set up keys
-        for key in self.continents.keys():
-
-            # Set count to zero
-            region_count[key] = 0
-
-            # Set total count to zero
-            total_region_count[key] = 0
-
-        # Loop through every region
-        for region_id in self.regions:
-            total_region_count[self.regions[region_id]['continent_id']] += 1
-
-        # Loop through options
-        for option in options:
-            option = int(option)
-            # Get continent
-            if option not in self.regions:
-                return self.regions
-            continent_id = self.regions[option]['continent_id']
-
-            # Increment region count for continent by one
-            region_count[continent_id] += 1
-
-        # Get sorted representation of region_count
-        sorted_count = sorted(
-            region_count.items(),
-            key = lambda x: (float(x[1]) / total_region_count[x[0]], self.continents[x[0]]),
-            reverse = True
-        )
-   
-        # Initialize picking regions list
-        picked_regions = []
-
-        # Loop through sorted pairs
-        for pair in sorted_count:
-
-            # Loop through regions
-            for region_id in options:
+        # Count pickable regions per continent
+        pick_count = dict([(continent_id, 0) for continent_id in self.continents])
+        option_ids = [int(option) for option in options if int(option) in self.regions]
+        for region_id in option_ids:
+            pick_count[self.regions[region_id]['continent_id']] += 1
+
+        # Score a single option
+        def score(region_id):
+            continent_id = self.regions[region_id]['continent_id']
+            metrics = self.continent_metrics[continent_id]
+            return (
+                PICK_DENSITY_WEIGHT * pick_count[continent_id] / metrics['region_count'] +
+                PICK_VALUE_WEIGHT * metrics['value'] +
+                PICK_DEFENSIBILITY_WEIGHT * metrics['defensibility'] +
+                PICK_CENTRALITY_WEIGHT * self.regions[region_id]['centrality']
+            )
+
+        # Sort options by score
+        picked_regions = sorted(option_ids, key = score, reverse = True)
 
-                # Check if continent is current one
-                if self.regions[int(region_id)]['continent_id'] == pair[0]:
-
-                    # Append to picked_regions
-                    picked_regions.append(int(region_id))
-            
         # Return list
         return ' '.join([str(region) for region in picked_regions[:6]])
-    def place_troops(self):
+    def place_troops(self, deadline=None):
         """
-        Place troops in the needed countries
+        Place troops in the needed countries, troops that remain are placed
+        according to the best candidate placement that can be found before
+        the deadline, or on the most threatened border region if none is
 
         Tests:
         >>> bot = Bot()
@@ -402,12 +648,25 @@ class Bot(object):
         >>> bot.setup_map(["regions", '1', '1', '2', '1', '3', '1', '4', '1', '5', '1', '6', '1', '7', '1', '8', '1', '9', '1', '10', '2', '11', '2', '12', '2', '13', '2', '14', '3', '15', '3', '16', '3', '17', '3', '18', '3', '19', '3', '20', '3', '21', '4', '22', '4', '23', '4', '24', '4', '25', '4', '26', '4', '27', '5', '28', '5', '29', '5', '30', '5', '31', '5', '32', '5', '33', '5', '34', '5', '35', '5', '36', '5', '37', '5', '38', '5', '39', '6', '40', '6', '41', '6', '42', '6'])
         >>> bot.setup_map(["neighbors", '1', '2,4,30', '2', '4,3,5', '3', '5,6,14', '4', '5,7', '5', '6,7,8', '6', '8', '7', '8,9', '8', '9', '9', '10', '10', '11,12', '11', '12,13', '12', '13,21', '14', '15,16', '15', '16,18,19', '16', '17', '17', '19,20,27,32,36', '18', '19,20,21', '19', '20', '20', '21,22,36', '21', '22,23,24', '22', '23,36', '23', '24,25,26,36', '24', '25', '25', '26', '27', '28,32,33', '28', '29,31,33,34', '29', '30,31', '30', '31,34,35', '31', '34', '32', '33,36,37', '33', '34,37,38', '34', '35', '36', '37', '37', '38', '38', '39', '39', '40,41', '40', '41,42', '41', '42'])
         >>> bot.pick_starting_regions(["5", "3", "11", "12", "16", "18", "26", "25", "31", "38", "42", "41"])
-        '11 12 42 41 26 25'
+        '41 42 12 11 16 18'
         >>> bot.update_map(["1", "bot1", "2", "2", "bot1", "4", "3", "neutral", "2", "4", "bot2", "5"])
         >>> bot.place_troops()
         'bot_1 place_armies 1 5'
         >>> bot.regions.itervalues().next()['troop_count']
         2
+        >>> bot = Bot()
+        >>> bot.update_settings("your_bot", "bot1")
+        >>> bot.update_settings("opponent_bot", "bot2")
+        >>> bot.update_settings("starting_armies", "5")
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5"])
+        >>> bot.update_map(["1", "bot1", "2", "2", "neutral", "2", "3", "neutral", "2", "4", "bot2", "5"])
+        >>> bot.place_troops(time() + 0.5)
+        'bot1 place_armies 1 5'
+        >>> bot.update_settings("starting_armies", "5")
+        >>> bot.place_troops(time())
+        'bot1 place_armies 1 5'
         """
         # List to hold placements
         placements = []
@@ -488,13 +747,314 @@ class Bot(object):
         
         # Check if troops remain
         if self.settings['starting_armies'] > 0:
-        
-            # Get continent to conquer
-            # Still doing this
-            pass
+
+            # Get our regions that border someone else
+            border_region_ids = [
+                region_id for region_id in self.regions
+                if self.regions[region_id]['owner'] == self.settings['your_bot']
+                and len([neighbour for neighbour in self.get_neighbours(region_id) if self.regions[neighbour]['owner'] != self.settings['your_bot']]) > 0
+            ]
+
+            # Find best way to place remaining troops
+            best_placement = self.evaluate_placements(self.generate_placements(border_region_ids, int(self.settings['starting_armies'])), deadline)
+
+            # Nothing found in time, put all troops on the most threatened region
+            if best_placement is None and len(border_region_ids) > 0:
+                best_placement = [(max(border_region_ids, key = self.calculate_threat), int(self.settings['starting_armies']))]
+
+            # Check if there is anything to place
+            if best_placement is not None:
+
+                # Place troops
+                for region_id, troops in best_placement:
+                    placements.append((self.settings['your_bot'], region_id, troops))
+
+                # Deduct troops
+                self.settings['starting_armies'] = 0
                 
         # Return the move we did
         return ', '.join(['%s place_armies %s %s' % (placement[0], placement[1], placement[2]) for placement in placements])
+    def generate_placements(self, region_ids, troops):
+        """
+        Generator of candidate placements of the given number of troops: all
+        troops on a single region, or split over two regions in every way.
+        Candidates are made one at a time, so only those that are scored
+        before the deadline cost anything.
+
+        Tests:
+        >>> bot = Bot()
+        >>> list(bot.generate_placements([1, 2], 3))
+        [[(1, 3)], [(2, 3)], [(1, 1), (2, 2)], [(1, 2), (2, 1)]]
+        >>> list(bot.generate_placements([], 3))
+        []
+        """
+        # All troops on a single region
+        for region_id in region_ids:
+            yield [(region_id, troops)]
+
+        # Loop through pairs of regions
+        for i in range(len(region_ids)):
+            for j in range(i + 1, len(region_ids)):
+
+                # Loop through splits
+                for split in range(1, troops):
+                    yield [(region_ids[i], split), (region_ids[j], troops - split)]
+    def get_move_deadline(self, time_limit):
+        """
+        Returns the time by which placements must be scored, given the time
+        (in milliseconds) the engine allows for the move. Only a share of
+        that time is used, capped by the time per move if known.
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.get_move_deadline(None)
+        >>> 0.9 < bot.get_move_deadline("2000") - time() <= 1.0
+        True
+        >>> bot.update_settings("time_per_move", "500")
+        >>> 0.2 < bot.get_move_deadline("2000") - time() <= 0.25
+        True
+        """
+        # No time given, no deadline
+        if time_limit is None:
+            return None
+
+        # Use at most the time per move, if known
+        time_limit = int(time_limit)
+        if 'time_per_move' in self.settings:
+            time_limit = min(time_limit, int(self.settings['time_per_move']))
+
+        # Keep a safety margin
+        return time() + time_limit * MOVE_TIME_SHARE / 1000.0
+    def calculate_threat(self, region_id):
+        """
+        Returns the number of opponent troops next to a region minus the
+        troops in it
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.update_settings("opponent_bot", "bot2")
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5"])
+        >>> bot.update_map(["1", "bot1", "2", "2", "bot1", "4", "3", "bot2", "6", "4", "bot2", "5"])
+        >>> bot.calculate_threat(1)
+        9
+        >>> bot.calculate_threat(2)
+        2
+        """
+        # Get total enemy troop count
+        enemy_troop_count = sum([self.regions[neighbour]['troop_count'] for neighbour in self.get_neighbours(region_id) if self.regions[neighbour]['owner'] == self.settings.get('opponent_bot')])
+
+        # Subtract own troops
+        return enemy_troop_count - self.regions[region_id]['troop_count']
+    def share_board(self):
+        """
+        Copy the board state into shared memory arrays, so worker processes
+        can read it without it being pickled. The arrays are created once,
+        after that only troop counts and owners are rewritten in place.
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.update_settings("your_bot", "bot1")
+        >>> bot.update_settings("opponent_bot", "bot2")
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5"])
+        >>> bot.update_map(["1", "bot1", "2", "2", "bot1", "4", "3", "neutral", "2", "4", "bot2", "5"])
+        >>> bot.share_board()
+        >>> bot.board['troops'][:]
+        [2, 4, 2, 5, 0]
+        >>> bot.board['owners'][:]
+        [1, 1, 0, 2, 0]
+        >>> bot.board['offsets'][:]
+        [0, 3, 5, 7, 9, 10]
+        >>> bot.board['neighbours'][:]
+        [1, 2, 3, 0, 2, 0, 1, 0, 4, 3]
+        """
+        # Check if arrays need to be (re)created
+        if len(self.board_index) != len(self.regions):
+
+            # Workers hold on to the old arrays
+            self.stop_board_workers()
+
+            # Give every region a fixed index
+            self.board_index = dict([(region_id, index) for index, region_id in enumerate(sorted(self.regions))])
+
+            # Set up adjacency in compressed form: the neighbours of index i
+            # are neighbours[offsets[i]:offsets[i + 1]]
+            offsets = [0]
+            neighbours = []
+            for region_id in sorted(self.regions):
+                neighbours += [self.board_index[neighbour] for neighbour in self.get_neighbours(region_id)]
+                offsets.append(len(neighbours))
+
+            # Create shared arrays
+            self.board = {
+                'troops': RawArray('i', len(self.regions)),
+                'owners': RawArray('i', len(self.regions)),
+                'offsets': RawArray('i', offsets),
+                'neighbours': RawArray('i', neighbours)
+            }
+
+        # Get owner codes
+        owner_codes = {
+            self.settings.get('your_bot'): OWNER_SELF,
+            self.settings.get('opponent_bot'): OWNER_OPPONENT
+        }
+
+        # Write troop counts and owners
+        for region_id, index in self.board_index.iteritems():
+            self.board['troops'][index] = self.regions[region_id]['troop_count']
+            self.board['owners'][index] = owner_codes.get(self.regions[region_id]['owner'], OWNER_NEUTRAL)
+    def start_board_workers(self, processes=None):
+        """
+        Start worker pool that reads the shared board
+        """
+        # Check if already running
+        if self.board_pool is not None:
+            return
+
+        # Remember number of workers
+        self.board_workers = processes or multiprocessing.cpu_count()
+
+        # Start pool, workers get the shared arrays when they are forked
+        self.board_pool = multiprocessing.Pool(
+            self.board_workers,
+            init_board_worker,
+            (self.board['troops'], self.board['owners'], self.board['offsets'], self.board['neighbours'])
+        )
+    def stop_board_workers(self):
+        """
+        Stop worker pool, if any
+        """
+        # Check if running
+        if self.board_pool is None:
+            return
+
+        # Kill workers
+        self.board_pool.terminate()
+        self.board_pool.join()
+        self.board_pool = None
+    def evaluate_placements(self, candidates, deadline=None, processes=None):
+        """
+        Returns the best scoring placement out of the given candidates,
+        where every candidate is a list of (region id, troops) pairs.
+        Candidates are read lazily, at most `MAX_PLACEMENT_CANDIDATES` of
+        them. Many candidates are split into slices and scored by worker
+        processes, which read the board from shared memory. Each worker
+        gets one slice at a time and no more slices are handed out after
+        the deadline (a `time()` value), so nothing is left queued for the
+        next move. Returns the best candidate scored so far, or None.
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.update_settings("your_bot", "bot1")
+        >>> bot.update_settings("opponent_bot", "bot2")
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5"])
+        >>> bot.update_map(["1", "bot1", "2", "2", "bot1", "4", "3", "neutral", "2", "4", "bot2", "5"])
+        >>> bot.evaluate_placements([[(2, 5)], [(1, 5)], [(1, 2), (2, 3)]])
+        [(1, 5)]
+        >>> candidates = [[(1, troops), (2, 5 - troops)] for troops in range(6)] * 200
+        >>> bot.evaluate_placements(candidates, time() + 2, 2)
+        [(1, 3), (2, 2)]
+        >>> bot.evaluate_placements(iter(candidates), time(), 2)
+        >>> bot.stop_board_workers()
+        >>> bot.evaluate_placements([[(1, 5)]], time())
+        >>> bot.evaluate_placements([])
+        """
+        # Bring shared board up to date
+        self.share_board()
+
+        # Read candidates lazily, up to the maximum
+        candidates = islice(candidates, MAX_PLACEMENT_CANDIDATES)
+
+        # Candidates read so far, in order
+        seen_candidates = []
+
+        # Returns the next slice of (candidate index, indexed placement) pairs
+        def next_slice(size):
+            indexed_candidates = []
+            for candidate in islice(candidates, size):
+                indexed_candidates.append((len(seen_candidates), [(self.board_index[region_id], troops) for region_id, troops in candidate]))
+                seen_candidates.append(candidate)
+            return indexed_candidates
+
+        # Best (score, candidate index) pair
+        best = None
+
+        # Get first slice
+        first_slice = next_slice(MIN_PARALLEL_CANDIDATES)
+
+        # Not worth using workers for a few candidates
+        if processes == 1 or len(first_slice) < MIN_PARALLEL_CANDIDATES:
+
+            # Score candidates in this process, a slice at a time
+            indexed_candidates = first_slice
+            while indexed_candidates:
+                for candidate_index, placement in indexed_candidates:
+
+                    # Stop when out of time
+                    if deadline is not None and time() > deadline:
+                        break
+
+                    # Keep the highest score, earliest candidate wins ties
+                    score = score_placement(self.board, placement)
+                    if best is None or score > best[0]:
+                        best = (score, candidate_index)
+
+                # Get next slice, unless out of time
+                if deadline is not None and time() > deadline:
+                    break
+                indexed_candidates = next_slice(PLACEMENT_SLICE_SIZE)
+
+        # Score candidates in worker processes
+        else:
+
+            # Make sure workers are running
+            self.start_board_workers(processes)
+
+            # Slices handed out and not yet collected, at most one per worker,
+            # so at most that much work is left behind when time runs out
+            pending = []
+            indexed_candidates = first_slice
+
+            # Keep going until all slices are collected
+            while True:
+
+                # Hand out slices while there are idle workers and time left
+                while indexed_candidates and len(pending) < self.board_workers:
+                    if deadline is not None and time() > deadline:
+                        break
+                    pending.append(self.board_pool.apply_async(score_placement_slice, (indexed_candidates,)))
+                    indexed_candidates = next_slice(PLACEMENT_SLICE_SIZE)
+
+                # All done
+                if not pending:
+                    break
+
+                # Wait for the oldest slice, but not beyond the deadline
+                try:
+                    if deadline is None:
+                        result = pending.pop(0).get()
+                    else:
+                        result = pending.pop(0).get(max(0, deadline - time()))
+
+                # Out of time, late results are never read
+                except multiprocessing.TimeoutError:
+                    break
+
+                # Merge result, earliest candidate wins ties
+                if best is None or (result[0], -result[1]) > (best[0], -best[1]):
+                    best = result
+
+        # Check if anything was scored in time
+        if best is None:
+            return None
+
+        # Return best candidate
+        return seen_candidates[best[1]]
     def attack_transfer(self):
         """
         Attack with countries and transfer unneeded troops
@@ -596,6 +1156,22 @@ class Bot(object):
         60
         """
         return int(ceil(attacking_troops * 0.6))
+    def calculate_surviving_troops(self, attacking_troops, defending_troops):
+        """
+        Returns the average number of attack troops left after taking a
+        region with the given amount of defending troops. At least one
+        troop is left to hold the region.
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.calculate_surviving_troops(7, 4)
+        4
+        >>> bot.calculate_surviving_troops(5, 2)
+        3
+        >>> bot.calculate_surviving_troops(2, 5)
+        1
+        """
+        return max(1, attacking_troops - int(ceil(defending_troops * 0.7)))
     def get_neighbours(self, region_id):
         """
         Returns all neighbouring region id's connected to a given region
@@ -611,12 +1187,15 @@ class Bot(object):
         [1, 5]
         >>> bot.get_neighbours(5)
         [4]
+        >>> bot.setup_map(["regions", "6", "2"])
+        >>> bot.get_neighbours(6)
+        []
         """
         # Check if node exists in graph
         if region_id in self.regions:
 
-            # Return all neighbours
-            return self.connections[region_id]
+            # Return all neighbours, regions without connections have none
+            return self.connections.get(region_id, [])
 
         # Return no neighbours
         return []
@@ -654,6 +1233,196 @@ class Bot(object):
 
         # Return the list
         return list(second_degree_neighbours)
+    def find_chokepoints(self, region_ids):
+        """
+        Returns the articulation points and bridges of the graph made up of
+        the given regions and the connections between them. Removing an
+        articulation point or a bridge splits the graph in two. Uses an
+        iterative version of Tarjan's algorithm, so it runs in linear time
+        and does not hit the recursion limit on large maps.
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5"])
+        >>> articulation_points, bridges = bot.find_chokepoints(bot.regions.keys())
+        >>> sorted(articulation_points)
+        [1, 4]
+        >>> sorted(bridges)
+        [(1, 4), (4, 5)]
+        >>> articulation_points, bridges = bot.find_chokepoints([1, 2, 3])
+        >>> sorted(articulation_points), sorted(bridges)
+        ([], [])
+        >>> articulation_points, bridges = bot.find_chokepoints([2, 3, 4, 5])
+        >>> sorted(articulation_points), sorted(bridges)
+        ([], [(2, 3), (4, 5)])
+        >>> bot = Bot()
+        >>> bot.setup_map(["super_regions", "1", "2"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "1"])
+        >>> bot.setup_map(["neighbors", "1", "2"])
+        >>> sorted(bot.map_bridges)
+        [(1, 2)]
+        """
+        # Make lookups constant time
+        region_ids = set(region_ids)
+
+        # Discovery order and lowest reachable discovery order per region
+        order = {}
+        low = {}
+
+        # Results
+        articulation_points = set()
+        bridges = set()
+
+        # Loop through regions, every undiscovered one starts a new tree
+        for root in sorted(region_ids):
+
+            # Skip already discovered regions
+            if root in order:
+                continue
+
+            # Discover root
+            order[root] = low[root] = len(order)
+
+            # Number of subtrees hanging from root
+            root_children = 0
+
+            # Depth first search stack of (region, parent, neighbour iterator)
+            stack = [(root, None, iter(set(self.get_neighbours(root))))]
+
+            # Keep going until tree is exhausted
+            while stack:
+
+                # Get current region
+                region_id, parent_id, neighbours = stack[-1]
+
+                # Loop through remaining neighbours until an undiscovered one is found
+                for neighbour_id in neighbours:
+
+                    # Skip regions outside the graph and the edge we came from
+                    if neighbour_id not in region_ids or neighbour_id == parent_id:
+                        continue
+
+                    # Back edge
+                    if neighbour_id in order:
+                        low[region_id] = min(low[region_id], order[neighbour_id])
+
+                    # Tree edge, descend
+                    else:
+                        order[neighbour_id] = low[neighbour_id] = len(order)
+                        stack.append((neighbour_id, region_id, iter(set(self.get_neighbours(neighbour_id)))))
+                        break
+
+                # All neighbours done, go back up
+                else:
+                    stack.pop()
+
+                    # Nothing to update for root
+                    if parent_id is None:
+                        continue
+
+                    # Pass lowest reachable order to parent
+                    low[parent_id] = min(low[parent_id], low[region_id])
+
+                    # Edge is a bridge if this subtree can not reach above it
+                    if low[region_id] > order[parent_id]:
+                        bridges.add((min(parent_id, region_id), max(parent_id, region_id)))
+
+                    # Root is handled after the search
+                    if parent_id == root:
+                        root_children += 1
+
+                    # Parent is an articulation point if this subtree can not get around it
+                    elif low[region_id] >= order[parent_id]:
+                        articulation_points.add(parent_id)
+
+            # Root is an articulation point if it has more than one subtree
+            if root_children > 1:
+                articulation_points.add(root)
+
+        # Return both
+        return articulation_points, bridges
+    def update_map_chokepoints(self):
+        """
+        Find chokepoints of the whole map, which only needs to be done once
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5"])
+        >>> [region_id for region_id in bot.regions if bot.regions[region_id]['is_map_chokepoint']]
+        [1, 4]
+        >>> sorted(bot.map_bridges)
+        [(1, 4), (4, 5)]
+        """
+        # Get chokepoints
+        articulation_points, self.map_bridges = self.find_chokepoints(self.regions.keys())
+
+        # Mark regions
+        for region_id in self.regions:
+            self.regions[region_id]['is_map_chokepoint'] = region_id in articulation_points
+    def update_empire_chokepoints(self):
+        """
+        Find chokepoints of our own regions, losing one of these splits the
+        empire. Nothing is recomputed if we own the same regions as before.
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.update_settings("your_bot", "bot1")
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5"])
+        >>> bot.update_map(["1", "bot1", "2", "2", "bot1", "4", "3", "neutral", "2", "4", "bot1", "5"])
+        >>> [region_id for region_id in bot.regions if bot.regions[region_id]['is_empire_chokepoint']]
+        [1]
+        >>> sorted(bot.empire_bridges)
+        [(1, 2), (1, 4)]
+        >>> bot.update_map(["1", "bot1", "2", "2", "bot1", "4", "3", "bot1", "1", "4", "bot1", "5", "5", "neutral", "2"])
+        >>> [region_id for region_id in bot.regions if bot.regions[region_id]['is_empire_chokepoint']]
+        [1]
+        >>> sorted(bot.empire_bridges)
+        [(1, 4)]
+        >>> bot.is_bridge(4, 1)
+        True
+        """
+        # Get our regions
+        empire_region_ids = frozenset([region_id for region_id in self.regions if self.regions[region_id]['owner'] == self.settings.get('your_bot')])
+
+        # Nothing changed, index is still valid
+        if empire_region_ids == self.empire_region_ids:
+            return
+
+        # Remember which regions the index belongs to
+        self.empire_region_ids = empire_region_ids
+
+        # Get chokepoints
+        articulation_points, self.empire_bridges = self.find_chokepoints(empire_region_ids)
+
+        # Mark regions
+        for region_id in self.regions:
+            self.regions[region_id]['is_empire_chokepoint'] = region_id in articulation_points
+    def is_bridge(self, region_id, neighbour_id, empire=True):
+        """
+        Returns whether the connection between two regions is a bridge of
+        our empire, or of the whole map if empire is False
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5"])
+        >>> bot.is_bridge(5, 4, False)
+        True
+        >>> bot.is_bridge(1, 2, False)
+        False
+        """
+        # Get bridges
+        bridges = self.empire_bridges if empire else self.map_bridges
+
+        # Bridges are stored with the lowest id first
+        return (min(region_id, neighbour_id), max(region_id, neighbour_id)) in bridges
     def breadth_first_search(self, start, end):
         """
         Returns shortest path between two nodes
@@ -712,6 +1481,280 @@ class Bot(object):
         # Return empty list in case of no path
         return []
 
+#---------------------------------------#
+# Opponent tracker class                #
+#---------------------------------------#
+class OpponentTracker(object):
+    """
+    Keeps an estimate of the opponent's state, updated with every visible
+    map update and every opponent move, so regions hidden by the fog of
+    war do not keep stale owner and troop data
+    """
+    def __init__(self, bot):
+        """
+        Constructor to set up standard values
+
+        Tests:
+        >>> tracker = OpponentTracker(Bot())
+        >>> tracker.troop_counts
+        {}
+        >>> tracker.income
+        5
+        """
+        # Bot whose map is kept up to date
+        self.bot = bot
+
+        # Dictionary containing estimated troop counts of opponent regions
+        self.troop_counts = {}
+
+        # Set containing regions seen in the last map update
+        self.visible_region_ids = set()
+
+        # Troops the opponent was seen placing this round
+        self.placed_troops = 0
+
+        # Dictionary containing our former troop counts of regions lost this round
+        self.lost_troop_counts = {}
+
+        # Set containing continents the opponent is believed to own
+        self.owned_continents = set()
+
+        # Estimated number of troops the opponent gets per round
+        self.income = 5
+    def update_map(self, region_ids):
+        """
+        Merge a map update with the estimate: visible regions are known for
+        sure, hidden regions get their estimated owner and troop count
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.update_settings("your_bot", "bot1")
+        >>> bot.update_settings("opponent_bot", "bot2")
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5"])
+        >>> bot.update_map(["1", "bot1", "2", "2", "bot1", "4", "4", "bot2", "5", "5", "bot2", "3"])
+        >>> sorted(bot.opponent.troop_counts.items())
+        [(4, 5), (5, 3)]
+        >>> bot.update_map(["1", "bot1", "2", "2", "bot1", "4", "4", "bot1", "1"])
+        >>> sorted(bot.opponent.troop_counts.items())
+        [(5, 3)]
+        >>> bot.regions[5]['owner'], bot.regions[5]['troop_count']
+        ('bot2', 3)
+        >>> bot.update_map(["1", "bot1", "2", "4", "bot1", "1"])
+        >>> bot.regions[2]['owner'], bot.regions[2]['troop_count']
+        ('bot2', 1)
+        >>> sorted(bot.empire_region_ids)
+        [1, 4]
+        >>> bot.opponent.apply_moves(["bot2", "attack/transfer", "3", "2", "7"])
+        >>> bot.regions[2]['owner'], bot.regions[2]['troop_count']
+        ('bot2', 4)
+        """
+        # Get player names
+        opponent = self.bot.settings.get('opponent_bot')
+        player = self.bot.settings.get('your_bot')
+
+        # Remember what we can see
+        self.visible_region_ids = set(region_ids)
+
+        # New round, nothing placed or lost yet
+        self.placed_troops = 0
+        self.lost_troop_counts = {}
+
+        # Loop through all regions
+        for region_id, region in self.bot.regions.iteritems():
+
+            # Visible regions are exact
+            if region_id in self.visible_region_ids:
+                if region['owner'] == opponent:
+                    self.troop_counts[region_id] = region['troop_count']
+                elif region_id in self.troop_counts:
+                    del self.troop_counts[region_id]
+
+            # We always see our own regions, so a hidden one was taken by
+            # the opponent; start with the minimum until the attack is seen
+            elif region['owner'] == player:
+                self.lost_troop_counts[region_id] = region['troop_count']
+                self.troop_counts[region_id] = 1
+                self.update_region(region_id)
+
+            # Keep last known state of hidden opponent regions
+            elif region['owner'] == opponent and region_id not in self.troop_counts:
+                self.troop_counts[region_id] = region['troop_count']
+
+            # Hidden regions get the estimate
+            elif region_id in self.troop_counts:
+                self.update_region(region_id)
+
+        # Update continents and income
+        self.update_income()
+    def parse_moves(self, options):
+        """
+        Generator that reads moves one at a time from the given tokens and
+        yields (player, action, arguments) tuples
+
+        Tests:
+        >>> tracker = OpponentTracker(Bot())
+        >>> list(tracker.parse_moves(["bot2", "place_armies", "4", "2", "bot2", "attack/transfer", "4", "1", "6"]))
+        [('bot2', 'place_armies', [4, 2]), ('bot2', 'attack/transfer', [4, 1, 6])]
+        >>> list(tracker.parse_moves(["bot2", "dance", "4"]))
+        []
+        """
+        # Number of arguments per action
+        argument_counts = {
+            'place_armies': 2,
+            'attack/transfer': 3
+        }
+
+        # Read tokens in order
+        tokens = iter(options)
+        for player in tokens:
+
+            # Get action
+            action = next(tokens, None)
+
+            # Unknown action, the rest can not be trusted
+            if action not in argument_counts:
+                stderr.write('Unable to understand move: "%s %s"\n' % (player, action))
+                return
+
+            # Get arguments
+            arguments = [int(token) for _, token in zip(range(argument_counts[action]), tokens)]
+
+            # Incomplete move
+            if len(arguments) < argument_counts[action]:
+                return
+
+            # Hand out move
+            yield player, action, arguments
+    def apply_moves(self, options):
+        """
+        Apply opponent moves to the estimate. Moves in visible regions are
+        already part of the map update, so only the placed troops are
+        counted for those.
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.update_settings("your_bot", "bot1")
+        >>> bot.update_settings("opponent_bot", "bot2")
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.setup_map(["neighbors", "1", "2,3,4", "2", "3", "4", "5"])
+        >>> bot.update_map(["1", "bot1", "2", "2", "bot1", "4", "3", "bot2", "5", "4", "bot2", "5", "5", "bot2", "3"])
+        >>> bot.update_map(["1", "bot1", "2", "2", "bot1", "4", "3", "bot2", "6"])
+        >>> bot.opponent.apply_moves(["bot2", "place_armies", "3", "1", "bot2", "place_armies", "5", "6", "bot2", "attack/transfer", "5", "4", "7"])
+        >>> bot.opponent.placed_troops
+        7
+        >>> sorted(bot.opponent.troop_counts.items())
+        [(3, 6), (4, 12), (5, 2)]
+        >>> bot.regions[4]['troop_count'], bot.regions[5]['troop_count']
+        (12, 2)
+        >>> bot.opponent.owned_continents
+        set([2])
+        >>> bot.opponent.income
+        10
+        """
+        # Get opponent name
+        opponent = self.bot.settings.get('opponent_bot')
+
+        # Loop through moves as they are read
+        for player, action, arguments in self.parse_moves(options):
+
+            # Only the opponent is of interest
+            if player != opponent:
+                continue
+
+            # Troops placed
+            if action == 'place_armies':
+                self.place_armies(*arguments)
+
+            # Troops moved
+            elif action == 'attack/transfer':
+                self.attack_transfer(*arguments)
+
+        # Update continents and income
+        self.update_income()
+    def place_armies(self, region_id, troops):
+        """
+        Apply a single opponent placement to the estimate
+        """
+        # Count towards income
+        self.placed_troops += troops
+
+        # Visible regions are already up to date
+        if region_id in self.visible_region_ids:
+            return
+
+        # Opponent must own the region, which holds at least one troop
+        self.troop_counts[region_id] = self.troop_counts.get(region_id, 1) + troops
+        self.update_region(region_id)
+    def attack_transfer(self, from_region_id, to_region_id, troops):
+        """
+        Apply a single opponent attack or transfer to the estimate
+        """
+        # Get estimated troops at destination before the move
+        defending_troops = self.bot.regions[to_region_id]['troop_count']
+
+        # Check if it is a transfer between opponent regions
+        is_transfer = to_region_id in self.troop_counts
+
+        # Troops leave hidden source region, at least one stays behind
+        if from_region_id not in self.visible_region_ids and from_region_id in self.troop_counts:
+            self.troop_counts[from_region_id] = max(1, self.troop_counts[from_region_id] - troops)
+            self.update_region(from_region_id)
+
+        # Visible destinations are already up to date
+        if to_region_id in self.visible_region_ids:
+            return
+
+        # Attack that took one of our regions, assume the average outcome
+        if to_region_id in self.lost_troop_counts:
+            self.troop_counts[to_region_id] = self.bot.calculate_surviving_troops(troops, self.lost_troop_counts.pop(to_region_id))
+            self.update_region(to_region_id)
+
+        # Transfer simply adds troops
+        elif is_transfer:
+            self.troop_counts[to_region_id] += troops
+            self.update_region(to_region_id)
+
+        # Attack on hidden region, assume the average outcome
+        elif troops >= self.bot.calculate_troops_needed(defending_troops):
+            self.troop_counts[to_region_id] = self.bot.calculate_surviving_troops(troops, defending_troops)
+            self.update_region(to_region_id)
+    def update_region(self, region_id):
+        """
+        Write estimate of a hidden region to the bot's map
+        """
+        self.bot.regions[region_id]['owner'] = self.bot.settings.get('opponent_bot')
+        self.bot.regions[region_id]['troop_count'] = self.troop_counts[region_id]
+    def update_income(self):
+        """
+        Update continents believed to be owned by the opponent and the
+        estimated income, which is at least what was seen being placed
+
+        Tests:
+        >>> bot = Bot()
+        >>> bot.update_settings("opponent_bot", "bot2")
+        >>> bot.setup_map(["super_regions", "1", "2", "2", "5"])
+        >>> bot.setup_map(["regions", "1", "1", "2", "1", "3", "2", "4", "2", "5", "2"])
+        >>> bot.update_map(["1", "bot2", "2", "2", "bot2", "4"])
+        >>> bot.opponent.owned_continents
+        set([1])
+        >>> bot.opponent.income
+        7
+        """
+        # Count regions per continent that are not the opponent's
+        missing_region_count = dict([(continent_id, 0) for continent_id in self.bot.continents])
+        for region_id, region in self.bot.regions.iteritems():
+            if region_id not in self.troop_counts:
+                missing_region_count[region['continent_id']] += 1
+
+        # Continents without missing regions are owned
+        self.owned_continents = set([continent_id for continent_id, count in missing_region_count.iteritems() if count == 0])
+
+        # Base income plus continent bonuses, or what we saw being placed
+        self.income = max(5 + sum([self.bot.continents[continent_id] for continent_id in self.owned_continents]), self.placed_troops)
+
 # If not used as external module, run the following lines of code
 if __name__ == '__main__':
 